@@ -50,6 +50,28 @@ OVERSCAN = 32  # overscan width in pixel
 SLIT_POSITION = np.array([9, 8, 1, 10, 7, 2, 11, 6, 3, 12, 5, 4])
 
 
+def _resample_slices(spe, xstart, xend, npix=NB_SPEC_PER_SLICE):
+    """Resample the spectra of several slices on ``npix`` pixels.
+
+    The spectrum of slice ``i`` is ``spe[xstart[i]:xend[i] + 1]``. Input pixel
+    ``j`` covers ``[j - 0.5, j + 0.5[``, so the spectra are step functions and
+    the flux in each output pixel is computed exactly from their cumulative
+    sum, the first and last pixels of a slice being extended beyond its edges.
+
+    Returns an array of shape ``(len(xstart), npix)``.
+
+    """
+    xstart = np.asarray(xstart)[:, np.newaxis]
+    xend = np.asarray(xend)[:, np.newaxis]
+    new_step = (xend - xstart + 1) / npix
+    # edges of the output pixels, shifted to have input pixel j on [j, j+1[
+    u = xstart + np.arange(npix + 1) * new_step + 0.5 * (1 - new_step)
+    k = np.clip(np.floor(u).astype(int), xstart, xend)
+    cumsum = np.concatenate(([0.], np.cumsum(spe)))
+    area = cumsum[k] + (u - k) * spe[k]
+    return np.diff(area, axis=1) / new_step
+
+
 class Channel:
 
     """Channel object corresponds to an extension of a MUSE raw FITS file.
@@ -60,6 +82,9 @@ class Channel:
         The extension name.
     filename : str
         The raw FITS file name.
+    hdulist : `astropy.io.fits.HDUList`
+        HDUList object, can be used to avoid opening the FITS file multiple
+        times when several channels are loaded.
 
     Attributes
     ----------
@@ -76,17 +101,24 @@ class Channel:
 
     """
 
-    def __init__(self, extname, filename):
+    def __init__(self, extname, filename, hdulist=None):
         self._logger = logging.getLogger(__name__)
         self.extname = extname
 
-        with fits.open(filename) as hdulist:
-            self.header = hdr = hdulist[extname].header
-            self.nx = hdr["NAXIS1"]
-            self.ny = hdr["NAXIS2"]
-            self.data = hdulist[extname].data
+        if hdulist is None:
+            with fits.open(filename) as hdulist:
+                self._read_hdu(hdulist[extname])
+        else:
+            self._read_hdu(hdulist[extname])
 
         self.mask = self._init_mask()
+        self._slices_limits = None
+
+    def _read_hdu(self, hdu):
+        self.header = hdr = hdu.header
+        self.nx = hdr["NAXIS1"]
+        self.ny = hdr["NAXIS2"]
+        self.data = hdu.data
 
     def _get_detector_indices(self, idx, with_prescan=True):
         """Return the indices for one quadrant, with prescan or not."""
@@ -150,6 +182,27 @@ class Channel:
             mask[sy, sx] = False
         return mask
 
+    def _get_slices_limits(self):
+        """Return the limits of the 48 slices in the trimmed image.
+
+        The limits are read from the ``ESO DET SLICE*`` keywords of a mask
+        channel the first time, and returned as an int array of shape (48, 4)
+        with the xstart, xend, ystart and yend columns.
+
+        """
+        if self._slices_limits is None:
+            hdr = self.header
+            keys = ('XSTART', 'XEND', 'YSTART', 'YEND')
+            limits = np.array([[hdr['ESO DET SLICE%d %s' % (sli, key)]
+                                for key in keys]
+                               for sli in range(1, 49)]) - OVERSCAN
+            xlim = limits[:, :2]
+            xlim[xlim > hdr["ESO DET CHIP NX"] / 2.0] -= 2 * OVERSCAN
+            ylim = limits[:, 2:]
+            ylim[ylim > hdr["ESO DET CHIP NY"] / 2.0] -= 2 * OVERSCAN
+            self._slices_limits = limits
+        return self._slices_limits
+
     def trimmed(self, copy=True):
         """Return a masked array where overscan pixels are masked."""
         return np.ma.MaskedArray(self.data, mask=self.mask, copy=copy)
@@ -375,6 +428,20 @@ class RawFile:
             self.channels[extname] = Channel(extname, self.filename)
         return self.channels[extname]
 
+    def _load_channels(self, extnames):
+        """Load several channels, opening the FITS file only once.
+
+        With a compressed file, this avoids decompressing the beginning of the
+        file again for each channel.
+
+        """
+        extnames = [name for name in extnames if self.channels[name] is None]
+        if extnames:
+            with fits.open(self.filename) as hdulist:
+                for name in extnames:
+                    self.channels[name] = Channel(name, self.filename,
+                                                  hdulist=hdulist)
+
     def __len__(self):
         """Return the number of extensions."""
         return self.next
@@ -483,8 +550,9 @@ class RawFile:
         if channels == "all":
             channels = self.get_channels_extname_list()
 
-        from scipy.integrate import quad
         raw_mask = RawFile(mask)
+        raw_mask._load_channels(channels)
+        self._load_channels(channels)
         white_ima = np.zeros((12 * 24, 300))
 
         for chan in channels:
@@ -494,39 +562,8 @@ class RawFile:
             mask = mask_chan.get_trimmed_image(bias=False).data.data
             ima *= mask
             spe = ima.sum(axis=0)
-            data = np.empty((48, NB_SPEC_PER_SLICE))
-            mhdr = mask_chan.header
-
-            for sli in range(1, 49):
-                xstart = mhdr['ESO DET SLICE%d XSTART' % sli] - OVERSCAN
-                xend = mhdr['ESO DET SLICE%d XEND' % sli] - OVERSCAN
-                if xstart > (mhdr["ESO DET CHIP NX"] / 2.0):
-                    xstart -= 2 * OVERSCAN
-                if xend > (mhdr["ESO DET CHIP NX"] / 2.0):
-                    xend -= 2 * OVERSCAN
-
-                spe_slice = spe[xstart:xend + 1]
-                n = spe_slice.shape[0]
-
-                if n < NB_SPEC_PER_SLICE:
-                    spe_slice_75pix = np.zeros(NB_SPEC_PER_SLICE)
-                    spe_slice_75pix[:n] = spe_slice
-                elif n == NB_SPEC_PER_SLICE:
-                    spe_slice_75pix = spe_slice
-                else:
-                    spe_slice_75pix = np.empty(NB_SPEC_PER_SLICE,
-                                               dtype=float)
-
-                f = lambda x: spe_slice[int(x + 0.5)]
-                pix = np.arange(NB_SPEC_PER_SLICE + 1, dtype=float)
-                new_step = float(n) / NB_SPEC_PER_SLICE
-                x = pix * new_step - 0.5 * new_step
-
-                for i in range(NB_SPEC_PER_SLICE):
-                    spe_slice_75pix[i] = quad(f, x[i], x[i + 1],
-                                              full_output=1)[0] / new_step
-
-                data[sli - 1, :] = spe_slice_75pix
+            xstart, xend = mask_chan._get_slices_limits()[:, :2].T
+            data = _resample_slices(spe, xstart, xend)
 
             # For each subslicer 1-4
             for k in range(1, NB_SUBSLICERS + 1):
@@ -565,27 +602,13 @@ class RawFile:
         self.whiteima.plot(cmap='copper')
 
     def _plot_slice_on_raw_image(self, ifu, sli, same_raw=False):
-        mask_raw = RawFile(self.mask_file)
         chan = 'CHAN%02d' % ifu
-        mask_chan = mask_raw.get_channel(chan)
+        mask_chan = self._mask_raw.get_channel(chan)
         mhdr = mask_chan.header
 
         self.x1 = mhdr['ESO DET SLICE1 XSTART'] - OVERSCAN
         self.x2 = mhdr['ESO DET SLICE48 XEND'] - 2 * OVERSCAN
-
-        xstart = mhdr['ESO DET SLICE%d XSTART' % sli] - OVERSCAN
-        xend = mhdr['ESO DET SLICE%d XEND' % sli] - OVERSCAN
-        if xstart > (mhdr["ESO DET CHIP NX"] / 2.0):
-            xstart -= 2 * OVERSCAN
-        if xend > (mhdr["ESO DET CHIP NX"] / 2.0):
-            xend -= 2 * OVERSCAN
-
-        ystart = mhdr['ESO DET SLICE%d YSTART' % sli] - OVERSCAN
-        yend = mhdr['ESO DET SLICE%d YEND' % sli] - OVERSCAN
-        if ystart > (mhdr["ESO DET CHIP NY"] / 2.0):
-            ystart -= 2 * OVERSCAN
-        if yend > (mhdr["ESO DET CHIP NY"] / 2.0):
-            yend -= 2 * OVERSCAN
+        xstart, xend, ystart, yend = mask_chan._get_slices_limits()[sli - 1]
 
         import matplotlib.pyplot as plt
         plt.plot(np.arange(xstart, xend + 1),
@@ -659,6 +682,7 @@ class RawFile:
                                 'mumdatMask_1x1', 'PAE_July2013.fits.gz')
 
         self.mask_file = mask
+        self._mask_raw = RawFile(mask)
         # create image
         self.whiteima = self.reconstruct_white_image(self.mask_file,
                                                      channels=channels)
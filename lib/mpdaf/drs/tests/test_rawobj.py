@@ -31,10 +31,14 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
 import numpy as np
+import os
 import pytest
 from astropy.utils.data import download_file
 from mpdaf.drs import RawFile
-from numpy.testing import assert_array_equal
+from mpdaf.drs import rawobj as rawobj_module
+from mpdaf.drs.rawobj import _resample_slices
+from numpy.testing import assert_allclose, assert_array_equal
+from scipy.integrate import quad
 
 
 @pytest.fixture
@@ -103,3 +107,44 @@ def test_raw_mask(rawobj):
     out = rawobj[1].overscan() * 2
     assert out.data[24, 12] == 2 * overscan
     assert out.data[240, 120] == pixel
+
+
+def test_resample_slices():
+    """Raw objects: tests the resampling of slices on 75 pixels"""
+    # Slices of 75, 80, 83 and 40 pixels. For the last one, the last output
+    # pixel extends beyond the edge of the slice, where the last input pixel
+    # is extended.
+    xstart = np.array([0, 75, 155, 238])
+    xend = np.array([74, 154, 237, 277])
+    spe = np.random.RandomState(42).uniform(0, 100, xend[-1] + 1)
+    res = _resample_slices(spe, xstart, xend)
+    assert res.shape == (4, 75)
+
+    for i in range(4):
+        sli = spe[xstart[i]:xend[i] + 1]
+        step = sli.shape[0] / 75
+        x = np.arange(76) * step - 0.5 * step
+        f = lambda x: sli[min(max(int(np.floor(x + 0.5)), 0), sli.size - 1)]
+        expected = [quad(f, x[j], x[j + 1], full_output=1)[0] / step
+                    for j in range(75)]
+        assert_allclose(res[i], expected, rtol=1e-6)
+
+
+def test_load_channels():
+    """Raw objects: tests loading several channels from one open file"""
+    maskfile = os.path.join(os.path.dirname(rawobj_module.__file__),
+                            'mumdatMask_1x1', 'PAE_July2013.fits.gz')
+    raw = RawFile(maskfile)
+    raw._load_channels(['CHAN01', 'CHAN02'])
+    assert raw.channels['CHAN03'] is None
+    chan = raw.channels['CHAN02']
+    assert raw.get_channel('CHAN02') is chan
+    assert chan.data.shape == (chan.ny, chan.nx)
+    assert_array_equal(chan.data,
+                       rawobj_module.Channel('CHAN02', maskfile).data)
+
+    limits = chan._get_slices_limits()
+    assert limits.shape == (48, 4)
+    assert chan._get_slices_limits() is limits
+    assert np.all(limits[:, 1] > limits[:, 0])
+    assert np.all(limits[:, 3] > limits[:, 2])
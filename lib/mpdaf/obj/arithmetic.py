@@ -36,7 +36,12 @@ import numpy as np
 from numpy import ma
 
 from .data import DataArray
-from .objs import UnitMaskedArray, UnitArray
+from .objs import UnitMaskedArray
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = False
 
 
 # Docstring templates for add, subtract, multiply, divide methods.
@@ -62,15 +67,25 @@ _arit_doc = """
 
     """
 
+# Numpy ufuncs equivalent to the numpy.ma operations when no mask is used.
+# ma.divide is not included as it also masks the invalid results.
+_UNMASKED_OPERATIONS = {
+    ma.add: np.add,
+    ma.subtract: np.subtract,
+    ma.multiply: np.multiply,
+}
+
 
 def _check_compatible_coordinates(a, b):
+    # The comparisons are skipped when both objects share the same
+    # coordinate object, which is necessarily equal to itself.
     if a.wave is not None and b.wave is not None and \
-            not a.wave.isEqual(b.wave):
+            a.wave is not b.wave and not a.wave.isEqual(b.wave):
         raise ValueError('Operation forbidden for cubes with different world '
                          'coordinates in spectral direction')
 
     if a.wcs is not None and b.wcs is not None and \
-            not a.wcs.isEqual(b.wcs):
+            a.wcs is not b.wcs and not a.wcs.isEqual(b.wcs):
         raise ValueError('Operation forbidden for cubes with different world '
                          'coordinates in spatial directions')
 
@@ -81,48 +96,148 @@ def _check_compatible_shapes(a, b, dims=slice(None)):
                          'shapes')
 
 
-def _arithmetic_data(operation, a, b, newshape=None):
+def _arithmetic_data(operation, a, b, newaxis=None):
     if a.unit != b.unit:
         data = UnitMaskedArray(b.data, b.unit, a.unit)
+    elif b._mask is ma.nomask:
+        # Without a mask on b, the raw array can be used directly
+        data = b._data
     else:
         data = b.data
-    if newshape is not None:
-        data = data.reshape(newshape)
-    return operation(a.data, data)
+    if newaxis is not None:
+        data = data[newaxis]
+    if operation not in _UNMASKED_OPERATIONS:
+        return operation(a.data, data)
+
+    ufunc = _UNMASKED_OPERATIONS[operation]
+    if isinstance(data, ma.MaskedArray):
+        data, mask = data.data, ma.getmask(data)
+    else:
+        mask = ma.nomask
+    if a._mask is ma.nomask and mask is ma.nomask:
+        # Neither operand has a mask, so the numpy ufunc gives the same result
+        # without the overhead of numpy.ma.
+        return ma.MaskedArray(ufunc(a._data, data), mask=ma.nomask)
+
+    # Combine the masks once and apply the numpy ufunc on the raw arrays,
+    # which gives the same result as the numpy.ma operation: masked elements
+    # keep the values of the first operand.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        res = ufunc(a._data, data)
+    if mask is ma.nomask or a._mask is ma.nomask:
+        # The mask of a single operand is broadcasted to the shape of the
+        # result, which differs from the shape of a for an image and a
+        # spectrum. broadcast_to gives a read-only view, which must be copied.
+        mask = a._mask if mask is ma.nomask else mask
+        mask = np.broadcast_to(mask, res.shape).copy()
+    else:
+        mask = a._mask | mask
+    np.copyto(res, a._data, casting='unsafe', where=mask)
+    return ma.MaskedArray(res, mask=mask)
 
 
-def _arithmetic_var(operation, a, b, newshape=None):
+def _arithmetic_var(operation, a, b, newaxis=None):
     if a._var is None and b._var is None:
         return None
 
     if b._var is not None:
-        if a.unit != b.unit:
-            var = UnitArray(b._var, b.unit**2, a.unit**2)
-        else:
-            var = b._var
+        var = b._var
+
+        # Scale factor to convert the variance of b to the unit of a, which
+        # is applied in the operations below instead of converting the array.
+        factor = 1 if a.unit == b.unit else float((b.unit**2).to(a.unit**2))
 
-        if newshape is not None:
-            var = var.reshape(newshape)
+        if newaxis is not None:
+            # When b is broadcasted against a, its variance array is smaller
+            # than the result, so it is cheaper to scale it beforehand.
+            if factor != 1:
+                var = var * factor
+                factor = 1
+            var = var[newaxis]
 
     if operation in (ma.add, ma.subtract):
-        if b.var is None:
-            return a.var
-        elif a.var is None:
-            return np.broadcast_to(var, a.shape)
+        # The shape of the result differs from the shape of a for an image
+        # and a spectrum.
+        b_data = b._data if newaxis is None else b._data[newaxis]
+        shape = np.broadcast(a._data, b_data).shape
+        if b._var is None:
+            # Copy to not share the variance array between a and the result,
+            # broadcast_to gives a read-only view.
+            return np.broadcast_to(a._var, shape).copy()
+        if a._var is None:
+            if factor != 1:
+                # The ufunc broadcasts the variance of b to the output array
+                return np.multiply(var, factor,
+                                   out=np.empty(shape, dtype=var.dtype))
+            # broadcast_to gives a read-only view, which must be copied
+            return np.broadcast_to(var, shape).copy()
+        elif factor != 1:
+            # Scale the variance of b directly into the output array, to
+            # avoid a temporary array for the scaled variance.
+            out = np.empty(np.broadcast(a._var, var).shape,
+                           dtype=np.result_type(a._var, var))
+            np.multiply(var, factor, out=out)
+            out += a._var
+            return out
         else:
-            return a.var + var
+            return a._var + var
     elif operation in (ma.multiply, ma.divide):
-        b_data = b._data.reshape(newshape)
-        if a._var is None:
-            var = var * a._data * a._data
-        elif b._var is None:
-            var = a._var * b_data * b_data
+        if numexpr and a._var is not None and b._var is not None:
+            # With numexpr, the whole expression is evaluated in a single
+            # blocked pass over the arrays, broadcasting b if needed, and
+            # written directly to the output array.
+            a_var, a_data = a._var, a._data
+            b_data = b._data if newaxis is None else b._data[newaxis]
+            # The output has the broadcast shape of the operands, which
+            # differs from the shape of a for an image and a spectrum.
+            out = np.empty(np.broadcast(a_data, b_data).shape,
+                           dtype=np.result_type(a_var, var, a_data, b_data))
+            expr = 'a_var * b_data * b_data + var * a_data * a_data'
+            if factor != 1:
+                # numexpr upcasts with Python floats, so the factor is given
+                # the output dtype to keep float32 arrays in float32.
+                factor = out.dtype.type(factor)
+                expr += ' * factor'
+            if operation is ma.divide:
+                # Multiplications instead of a power, which is slower
+                expr = '(%s) / (b_data * b_data * b_data * b_data)' % expr
+            return numexpr.evaluate(expr, out=out, casting='same_kind')
+
+        # Compute var(a) * b**2 + var(b) * a**2 (divided by b**4 for the
+        # division), accumulating the terms in place in the output array to
+        # avoid the allocation of cube-sized temporary arrays.
+        # When b is broadcasted against a, its square is computed once on
+        # the smaller array instead of multiplying the cube twice by b.
+        if newaxis is None:
+            b_data = b._data
+            b_data2 = None
         else:
-            var = var * a._data * a._data + a._var * b_data * b_data
+            b_data2 = np.square(b._data)[newaxis]
+        out = None
+        if a._var is not None:
+            if b_data2 is None:
+                out = np.multiply(a._var, b_data)
+                out *= b_data
+            else:
+                out = np.multiply(a._var, b_data2)
+        if b._var is not None:
+            tmp = np.multiply(var, a._data)
+            tmp *= a._data
+            if factor != 1:
+                tmp *= factor
+            if out is None:
+                out = tmp
+            else:
+                out += tmp
 
         if operation is ma.divide:
-            var /= (b_data ** 4)
-        return var
+            if b_data2 is None:
+                b_data4 = np.multiply(b_data, b_data)
+                b_data4 *= b_data4
+            else:
+                b_data4 = np.square(b_data2)
+            out /= b_data4
+        return out
 
 
 def _arithmetic(operation, a, b):
@@ -136,21 +251,23 @@ def _arithmetic(operation, a, b):
 
     _check_compatible_coordinates(a, b)
 
+    # Index used to add the missing axes to the arrays of b, which gives
+    # views that are broadcasted against the arrays of a.
     if a.ndim == 3 and b.ndim == 1:  # cube + spectrum
         _check_compatible_shapes(a, b, dims=0)
-        newshape = (-1, 1, 1)
+        newaxis = (slice(None), np.newaxis, np.newaxis)
     elif a.ndim == 3 and b.ndim == 2:  # cube + image
         _check_compatible_shapes(a, b, dims=slice(-1, -3, -1))
-        newshape = (1, ) + b.shape
+        newaxis = (np.newaxis, Ellipsis)
     elif a.ndim == 2 and b.ndim == 1:  # image + spectrum
         from .cube import Cube
         var = np.expand_dims(a.var, axis=0) if a.var is not None else None
         a = Cube.new_from_obj(a, data=np.expand_dims(a.data, axis=0), var=var)
         a.wave = b.wave.copy()
-        newshape = (-1, 1, 1)
+        newaxis = (slice(None), np.newaxis, np.newaxis)
     else:
         _check_compatible_shapes(a, b)
-        newshape = None
+        newaxis = None
 
     if operation is ma.multiply:
         unit = a.unit ** 2
@@ -161,60 +278,79 @@ def _arithmetic(operation, a, b):
 
     return a.__class__.new_from_obj(
         a, copy=False, unit=unit,
-        data=_arithmetic_data(operation, a, b, newshape=newshape),
-        var=_arithmetic_var(operation, a, b, newshape=newshape)
+        data=_arithmetic_data(operation, a, b, newaxis=newaxis),
+        var=_arithmetic_var(operation, a, b, newaxis=newaxis)
     )
 
 
+def _copy_var(obj):
+    """Return a copy of the variance, or False if there is no variance (to
+    tell new_from_obj to not use the variance of obj)."""
+    return False if obj._var is None else obj._var.copy()
+
+
+def _masked(data, obj):
+    """Return the new data array of an operation with a scalar as a masked
+    array, which keeps the masked pixels of obj and masks the pixels that
+    are not finite in the result."""
+    return ma.MaskedArray(data, mask=obj._mask | ~np.isfinite(data))
+
+
 class ArithmeticMixin:
 
+    # For the operations with scalars, the data and variance arrays are
+    # computed here as new arrays, so they don't need to be copied again by
+    # new_from_obj.
+
     def __add__(self, other):
         if not isinstance(other, DataArray):
             return self.__class__.new_from_obj(
-                self, data=self._data + other, copy=True)
+                self, data=_masked(self._data + other, self),
+                var=_copy_var(self))
         else:
             return _arithmetic(ma.add, self, other)
 
     def __sub__(self, other):
         if not isinstance(other, DataArray):
             return self.__class__.new_from_obj(
-                self, data=self._data - other, copy=True)
+                self, data=_masked(self._data - other, self),
+                var=_copy_var(self))
         else:
             return _arithmetic(ma.subtract, self, other)
 
     def __rsub__(self, other):
         if not isinstance(other, DataArray):
             return self.__class__.new_from_obj(
-                self, data=other - self._data, copy=True)
+                self, data=_masked(other - self._data, self),
+                var=_copy_var(self))
         # else:
         #     if other is a DataArray, it is already handled by __sub__
 
     def __mul__(self, other):
         if not isinstance(other, DataArray):
-            res = self.__class__.new_from_obj(
-                self, data=self._data * other, copy=True)
-            if self._var is not None:
-                res._var *= other ** 2
-            return res
+            return self.__class__.new_from_obj(
+                self, data=_masked(self._data * other, self),
+                var=False if self._var is None else self._var * other ** 2)
         else:
             return _arithmetic(ma.multiply, self, other)
 
     def __div__(self, other):
         if not isinstance(other, DataArray):
-            res = self.__class__.new_from_obj(
-                self, data=self._data / other, copy=True)
-            if self._var is not None:
-                res._var /= other ** 2
-            return res
+            return self.__class__.new_from_obj(
+                self, data=_masked(self._data / other, self),
+                var=False if self._var is None else self._var / other ** 2)
         else:
             return _arithmetic(ma.divide, self, other)
 
     def __rdiv__(self, other):
         if not isinstance(other, DataArray):
             res = self.__class__.new_from_obj(
-                self, data=other / self._data, copy=True)
+                self, data=_masked(other / self._data, self), var=False)
             if self._var is not None:
-                res._var = self._var * other**2 / (self._data**2)**2
+                data4 = self._data * self._data
+                data4 *= data4
+                res._var = self._var * other**2
+                res._var /= data4
             return res
         # else:
         #     if other is a DataArray, it is already handled by __div__
@@ -1972,26 +1972,24 @@ class WaveCoord:
 
     def to_header(self, naxis=1, use_cd=False):
         """Generate a astropy.fits header object with the WCS information."""
-        hdr = fits.Header()
-        hdr['WCSAXES'] = (naxis, 'Number of coordinate axes')
-        hdr['CRVAL%d' % naxis] = (self.get_crval(),
-                                  'Coordinate value at reference point')
-        hdr['CRPIX%d' % naxis] = (self.get_crpix(),
-                                  'Pixel coordinate of reference point')
-        hdr['CUNIT%d' % naxis] = (self.unit.to_string('fits'),
-                                  'Units of coordinate increment and value')
-        hdr['CTYPE%d' % naxis] = (self.get_ctype(),
-                                  'Coordinate type code')
+        # The cards are collected in a list and passed at once to the Header,
+        # which is faster than setting them one by one.
+        cards = [
+            ('WCSAXES', naxis, 'Number of coordinate axes'),
+            ('CRVAL%d' % naxis, self.get_crval(),
+             'Coordinate value at reference point'),
+            ('CRPIX%d' % naxis, self.get_crpix(),
+             'Pixel coordinate of reference point'),
+            ('CUNIT%d' % naxis, self.unit.to_string('fits'),
+             'Units of coordinate increment and value'),
+            ('CTYPE%d' % naxis, self.get_ctype(), 'Coordinate type code'),
+        ]
 
         if use_cd and naxis == 3:
-            hdr['CD3_3'] = self.get_step()
-            hdr['CD1_3'] = 0.
-            hdr['CD2_3'] = 0.
-            hdr['CD3_1'] = 0.
-            hdr['CD3_2'] = 0.
+            cards += [('CD3_3', self.get_step()), ('CD1_3', 0.),
+                      ('CD2_3', 0.), ('CD3_1', 0.), ('CD3_2', 0.)]
         else:
-            hdr['CDELT%d' % naxis] = (self.get_step(),
-                                      'Coordinate increment at reference '
-                                      'point')
+            cards.append(('CDELT%d' % naxis, self.get_step(),
+                          'Coordinate increment at reference point'))
 
-        return hdr
+        return fits.Header(cards)
@@ -54,6 +54,11 @@ from .objs import bounding_box, is_number
 from .spectrum import Spectrum
 from ..tools import add_mpdaf_method_keywords, MpdafWarning
 
+try:
+    import numexpr
+except ImportError:
+    numexpr = False
+
 __all__ = ('iter_spe', 'iter_ima', 'Cube')
 
 
@@ -89,12 +94,17 @@ def iter_spe(cube, index=False):
     `mpdaf.obj.Spectrum`
 
     """
-    if index:
-        for y, x in np.ndindex(*cube.shape[1:]):
-            yield cube[:, y, x], (y, x)
-    else:
-        for y, x in np.ndindex(*cube.shape[1:]):
-            yield cube[:, y, x]
+    # The spectra are created directly from views of the arrays of the cube,
+    # instead of slicing the cube for each pixel, which avoids to create an
+    # intermediate object and to copy the coordinates several times.
+    data, var = cube.data, cube._var
+    for y, x in np.ndindex(*cube.shape[1:]):
+        sp = Spectrum(
+            data=data[:, y, x], var=None if var is None else var[:, y, x],
+            wave=cube.wave, unit=cube.unit, filename=cube.filename,
+            data_header=cube.data_header.copy(),
+            primary_header=cube.primary_header.copy(), copy=False)
+        yield (sp, (y, x)) if index else sp
 
 
 def iter_ima(cube, index=False):
@@ -126,12 +136,16 @@ def iter_ima(cube, index=False):
     `mpdaf.obj.Image`
 
     """
-    if index:
-        for l in range(cube.shape[0]):
-            yield cube[l, :, :], l
-    else:
-        for l in range(cube.shape[0]):
-            yield cube[l, :, :]
+    # The images are created directly from views of the arrays of the cube,
+    # as in iter_spe.
+    data, var = cube.data, cube._var
+    for l in range(cube.shape[0]):
+        im = Image(
+            data=data[l], var=None if var is None else var[l],
+            wcs=cube.wcs, unit=cube.unit, filename=cube.filename,
+            data_header=cube.data_header.copy(),
+            primary_header=cube.primary_header.copy(), copy=False)
+        yield (im, l) if index else im
 
 
 class _MultiprocessReporter:
@@ -378,23 +392,30 @@ class Cube(ArithmeticMixin, DataArray):
         elif unit_wave is not None:
             lmax = self.wave.pixel(lmax, nearest=True, unit=unit_wave)
 
+        # Clip the wavelength range to the cube, as the mask is updated
+        # with slices in which negative indexes would wrap around.
+        lmin = max(lmin, 0)
+        lmax = min(lmax, self.shape[0])
+
         # Get Y-axis and X-axis slice objects that bound the rectangular area.
         [sy, sx], _, _ = bounding_box(
             form="rectangle", center=center, radii=radius,
             shape=self.shape[1:], step=step)
 
+        # With nomask there is no mask array to update.
+        if self._mask is ma.nomask:
+            return
+
         # Mask pixels inside the region.
         if inside:
-            self.data[lmin:lmax, sy, sx] = ma.masked
+            self._mask[lmin:lmax, sy, sx] = True
 
-        # Mask pixels outside the region.
+        # Mask pixels outside the region, by masking the whole cube and
+        # then restoring the previous mask of the region.
         else:
-            self.data[:lmin, :, :] = ma.masked
-            self.data[lmax:, :, :] = ma.masked
-            self.data[lmin:lmax, 0:sy.start, :] = np.ma.masked
-            self.data[lmin:lmax, sy.stop:, :] = np.ma.masked
-            self.data[lmin:lmax, sy, 0:sx.start] = np.ma.masked
-            self.data[lmin:lmax, sy, sx.stop:] = np.ma.masked
+            box = self._mask[lmin:lmax, sy, sx].copy()
+            self._mask.fill(True)
+            self._mask[lmin:lmax, sy, sx] = box
 
     def mask_ellipse(self, center, radius, posangle, lmin=None, lmax=None,
                      inside=True, unit_center=u.deg,
@@ -467,6 +488,11 @@ class Cube(ArithmeticMixin, DataArray):
         elif unit_wave is not None:
             lmax = self.wave.pixel(lmax, nearest=True, unit=unit_wave)
 
+        # Clip the wavelength range to the cube, as the mask is updated
+        # with slices in which negative indexes would wrap around.
+        lmin = max(lmin, 0)
+        lmax = min(lmax, self.shape[0])
+
         # Obtain Y and X axis slice objects that select the rectangular
         # region that just encloses the rotated ellipse.
         [sy, sx], _, center = bounding_box(
@@ -496,25 +522,38 @@ class Cube(ArithmeticMixin, DataArray):
         # ellipse and > 1 for pixels outside the ellipse.
         #
         #   k = (xp / rx)**2 + (yp / ry)**2
-        x, y = np.meshgrid(
-            (np.arange(sx.start, sx.stop) - center[1]) * step[1],
-            (np.arange(sy.start, sy.stop) - center[0]) * step[0])
-        ksel = (((x * cospa + y * sinpa) / radii[0]) ** 2 +
-                ((y * cospa - x * sinpa) / radii[1]) ** 2)
-
+        #
+        # The X and Y coordinates are a row and a column vector, which are
+        # broadcasted against each other to compute k on the 2D grid.
+        # The divisions by the radii are replaced by multiplications with
+        # the inverse of their squares. When numexpr is available, k is
+        # computed in a single pass without the intermediate 2D arrays.
+        x = (np.arange(sx.start, sx.stop) - center[1])[np.newaxis, :] * step[1]
+        y = (np.arange(sy.start, sy.stop) - center[0])[:, np.newaxis] * step[0]
+        irx2 = 1.0 / radii[0] ** 2
+        iry2 = 1.0 / radii[1] ** 2
+        if numexpr:
+            ksel = numexpr.evaluate(
+                '(x * cospa + y * sinpa)**2 * irx2 + '
+                '(y * cospa - x * sinpa)**2 * iry2')
+        else:
+            ksel = ((x * cospa + y * sinpa) ** 2 * irx2 +
+                    (y * cospa - x * sinpa) ** 2 * iry2)
+
+        # The 2D selection is broadcasted over the wavelength planes of the
+        # mask, which avoids expanding it to a 3D array. With nomask there
+        # is no mask array to update.
+        if self._mask is ma.nomask:
+            return
         if inside:
-            grid3d = np.resize(ksel < 1, (lmax - lmin, ) + ksel.shape)
-            self.data[lmin:lmax, sy, sx][grid3d] = ma.masked
+            self._mask[lmin:lmax, sy, sx] |= ksel < 1
         else:
-            self.data[:lmin, :, :] = ma.masked
-            self.data[lmax:, :, :] = ma.masked
-            self.data[lmin:lmax, :sy.start, :] = ma.masked
-            self.data[lmin:lmax, sy.stop:, :] = ma.masked
-            self.data[lmin:lmax, :, :sx.start] = ma.masked
-            self.data[lmin:lmax, :, sx.stop:] = ma.masked
-
-            grid3d = np.resize(ksel > 1, (lmax - lmin, ) + ksel.shape)
-            self.data[lmin:lmax, sy, sx][grid3d] = ma.masked
+            # Everything outside the bounding box is masked with a single
+            # fill, then the mask of the box is restored and updated with
+            # the pixels that lie outside the ellipse.
+            box = self._mask[lmin:lmax, sy, sx] | (ksel > 1)
+            self._mask.fill(True)
+            self._mask[lmin:lmax, sy, sx] = box
 
     def mask_polygon(self, poly, lmin=None, lmax=None,
                      unit_poly=u.deg, unit_wave=u.angstrom, inside=True):
@@ -541,15 +580,15 @@ class Cube(ArithmeticMixin, DataArray):
         """
 
         # Convert DEC,RA (deg) values coming from poly into Y,X value (pixels)
+        # with a single call for all the vertices. A copy is passed, because
+        # sky2pix converts the units of its input array in place.
         if unit_poly is not None:
-            poly = np.array([
-                [self.wcs.sky2pix((val[0], val[1]), unit=unit_poly)[0][0],
-                 self.wcs.sky2pix((val[0], val[1]), unit=unit_poly)[0][1]]
-                for val in poly])
+            poly = self.wcs.sky2pix(np.array(poly, dtype=float),
+                                    unit=unit_poly)
 
-        P, Q = np.meshgrid(list(range(self.shape[1])),
-                           list(range(self.shape[2])))
-        b = np.dstack([P.ravel(), Q.ravel()])
+        # The (p,q) indexes of all the pixels of the image, as an (N,2) array
+        # in the order of the flattened image.
+        b = np.indices(self.shape[1:]).reshape(2, -1).T
 
         # Use a matplotlib method to create a path, which is the polygon we
         # want to use.
@@ -558,15 +597,14 @@ class Cube(ArithmeticMixin, DataArray):
 
         # Go through all pixels in the image to see if they are within the
         # polygon. The ouput is a boolean table.
-        c = polymask.contains_points(b[0])
+        c = polymask.contains_points(b)
 
         # Invert the boolean table to mask pixels outside the polygon?
         if not inside:
-            c = ~np.array(c)
+            c = ~c
 
         # Convert the boolean table into a matrix.
-        c = c.reshape(self.shape[2], self.shape[1])
-        c = c.T
+        c = c.reshape(self.shape[1:])
 
         # Convert the minimum wavelength to a spectral pixel index.
         if lmin is None:
@@ -586,8 +624,8 @@ class Cube(ArithmeticMixin, DataArray):
         # When masking pixels outside the region, mask all pixels
         # outside the specified wavelength range.
         if not inside:
-            self.data[:lmin, :, :] = ma.masked
-            self.data[lmax:, :, :] = ma.masked
+            self._mask[:lmin, :, :] = True
+            self._mask[lmax:, :, :] = True
 
         return poly
 
@@ -847,10 +885,17 @@ class Cube(ArithmeticMixin, DataArray):
         if doweight and is_number(weights):
             weights = None      # This requests unit weights.
 
+        # When no pixel is masked, the unweighted sums are computed on the
+        # raw arrays with numpy, without the overhead of numpy.ma.
+        unmasked = (not doweight and
+                    (self._mask is ma.nomask or not self._mask.any()))
+
         # Sum all pixels to yield a single value?
         if axis is None:
             if doweight:
                 return self.mean(axis=axis, weights=weights) * np.prod(self.shape)
+            elif unmasked:
+                return self._data.sum()
             else:
                 return self.data.sum()
 
@@ -858,26 +903,32 @@ class Cube(ArithmeticMixin, DataArray):
         elif axis == 0:
             if doweight:
                 return self.mean(axis=axis, weights=weights) * self.shape[0]
+            elif unmasked:
+                data = ma.MaskedArray(self._data.sum(axis=0), mask=False)
+                var = None if self._var is None else self._var.sum(axis=0)
             else:
                 data = ma.sum(self.data, axis=0)
                 if self._var is not None:
                     var = ma.sum(self.var, axis=0)
                 else:
                     var = None
-                return Image.new_from_obj(self, data=data, var=var)
+            return Image.new_from_obj(self, data=data, var=var)
 
         # Sum along the image X and Y axes to yield a spectrum?
         elif axis == (1, 2):
             if doweight:
                 return self.mean(axis=axis, weights=weights) * np.prod(self.shape[1:])
+            elif unmasked:
+                data = ma.MaskedArray(self._data.sum(axis=(1, 2)), mask=False)
+                var = None if self._var is None else self._var.sum(axis=(1, 2))
             else:
                 data = ma.sum(ma.sum(self.data, axis=1), axis=1)
                 if self._var is not None:
                     var = ma.sum(ma.sum(self.var, axis=1), axis=1).filled(np.inf)
                 else:
                     var = None
-                return Spectrum(wave=self.wave, unit=self.unit, data=data,
-                                var=var, copy=False)
+            return Spectrum(wave=self.wave, unit=self.unit, data=data,
+                            var=var, copy=False)
         else:
             raise ValueError('Invalid axis argument')
 
@@ -945,19 +996,22 @@ class Cube(ArithmeticMixin, DataArray):
             # If the dimensions of the weights array does not match
             # the dimensions of the data, remedy this if possible using
             # the rules given in the description of the weights argument.
+            # The weights are broadcasted to the shape of the cube as
+            # read-only views, instead of being copied for each plane or
+            # spectrum.
             if not np.array_equal(weights.shape, self.shape):
                 msg = 'Wrong dimensions for the weights (%s) (should be (%s))'
                 if weights.ndim == 3:
                     raise ValueError(msg % (weights.shape, self.shape))
                 elif weights.ndim == 2:
                     if np.array_equal(weights.shape, self.shape[1:]):
-                        weights = np.tile(weights, (self.shape[0], 1, 1))
+                        weights = np.broadcast_to(weights, self.shape)
                     else:
                         raise ValueError(msg % (weights.shape, self.shape[1:]))
                 elif weights.ndim == 1:
                     if weights.shape[0] == self.shape[0]:
-                        weights = (np.ones_like(self._data) *
-                                   weights[:, np.newaxis, np.newaxis])
+                        weights = np.broadcast_to(
+                            weights[:, np.newaxis, np.newaxis], self.shape)
                     else:
                         raise ValueError(msg % (weights.shape[0],
                                                 self.shape[0]))
@@ -983,12 +1037,18 @@ class Cube(ArithmeticMixin, DataArray):
                 var = var.reshape(shape)
             axis = 1
 
-        # Average the data over the specified axis. Note that the
-        # wsum return value holds the sum of weights for each of the
-        # returned data points. When weights=None, this is the
-        # number of unmasked points that contributed to the average.
-        data, wsum = ma.average(data, axis=axis, weights=weights,
-                                returned=True)
+        # Average the data over the specified axis. Note that wsum
+        # holds the sum of weights for each of the returned data points.
+        # When weights=None, this is the number of unmasked points that
+        # contributed to the average, and the mean is computed directly
+        # as the sum of these points divided by their number, which
+        # avoids counting them twice in ma.average.
+        if weights is None:
+            wsum = data.count(axis=axis)
+            data = data.sum(axis=axis) / wsum
+        else:
+            data, wsum = ma.average(data, axis=axis, weights=weights,
+                                    returned=True)
 
         if var is not None:
             # Compute the variance of each averaged data-point,
@@ -1032,20 +1092,37 @@ class Cube(ArithmeticMixin, DataArray):
             returns a spectrum.
 
         """
-        if axis is None:
-            return np.ma.median(self.data)
-        elif axis == 0:
-            # return an image
-            data = np.ma.median(self.data, axis)
-            return Image.new_from_obj(self, data=data, var=False, copy=False)
-        elif axis == (1, 2):
-            # return a spectrum
-            data = np.ma.median(np.ma.median(self.data, axis=1), axis=1)
-            return Spectrum.new_from_obj(self, data=data, var=False,
-                                         copy=False)
-        else:
+        if axis is not None and axis != 0 and axis != (1, 2):
             raise ValueError('Invalid axis argument')
 
+        # np.nanmedian is much faster than np.ma.median, so the masked
+        # pixels are replaced by NaN in a copy of the data, and ignored by
+        # np.nanmedian. When no pixel is masked, np.median is used directly.
+        # Medians of fully masked pixels are NaN, which are then masked.
+        if self._mask is ma.nomask or not self._mask.any():
+            data, median = self._data, np.median
+        else:
+            data = np.where(self._mask, np.nan, self._data)
+            median = np.nanmedian
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            if axis is None:
+                res = median(data)
+                if median is np.nanmedian and np.isnan(res):
+                    return np.ma.masked
+                return res
+            elif axis == 0:
+                # return an image
+                data = median(data, axis=0)
+                return Image.new_from_obj(self, data=data, var=False,
+                                          copy=False)
+            else:
+                # return a spectrum
+                data = median(median(data, axis=1), axis=1)
+                return Spectrum.new_from_obj(self, data=data, var=False,
+                                             copy=False)
+
     def max(self, axis=None):
         """Return the maximum over a given axis.
 
@@ -2162,6 +2239,11 @@ def _multiproc_worker(arglist):
             .format(str(inst), obj.__class__.__name__, pos))
 
 
+def _multiproc_chunk_worker(chunk):
+    """Worker process for a chunk of loop_{spe/ima}_multiprocessing tasks"""
+    return [_multiproc_worker(arglist) for arglist in chunk]
+
+
 def _loop_multiprocessing(self, f, loop_type, cpu=None, verbose=True, **kargs):
     # Determine the number of processes:
     # - default: all CPUs except one.
@@ -2183,19 +2265,27 @@ def _loop_multiprocessing(self, f, loop_type, cpu=None, verbose=True, **kargs):
 
     if loop_type == 'ima':
         # There will be one task per image
-        processlist = [(k, f, self[k, :, :], kargs)
-                       for k in range(self.shape[0])]
+        processlist = [(k, f, ima, kargs)
+                       for ima, k in iter_ima(self, index=True)]
     elif loop_type == 'spe':
         # There will be one task per spectrum
-        processlist = [((p, q), f, self[:, p, q], kargs)
-                       for p, q in np.ndindex(self.shape[1:])]
+        processlist = [(pos, f, sp, kargs)
+                       for sp, pos in iter_spe(self, index=True)]
     else:
         raise ValueError('unsupported way to slice the cube')
 
+    # Send the tasks to the workers in chunks, sized in the same way as in
+    # Pool.map, to reduce the communication overhead for many small tasks.
+    chunksize, extra = divmod(len(processlist), cpu_count * 4)
+    if extra:
+        chunksize += 1
+    chunks = [processlist[i:i + chunksize]
+              for i in range(0, len(processlist), chunksize)]
+
     # Start passing tasks to the worker processes. The return
-    # value is an iterator that will hereafter return a new value
-    # each time that a worker process finishes one task.
-    results = pool.imap_unordered(_multiproc_worker, processlist)
+    # value is an iterator that will hereafter return a new list of
+    # results each time that a worker process finishes one chunk.
+    results = pool.imap_unordered(_multiproc_chunk_worker, chunks)
 
     # Tell the worker pool that no more tasks will be passed to it.
     pool.close()
@@ -2212,16 +2302,21 @@ def _loop_multiprocessing(self, f, loop_type, cpu=None, verbose=True, **kargs):
     # Wait for the results from each task and collect them into the appropriate
     # object. If verbose, also emit a progress report every few seconds.
     init = True
+    pending = []
     while True:
         try:
-            # Wait for the next result. When verbose=True, interrupt
-            # this wait every few seconds to allow a progress-report
-            # to be written to the user's terminal.
+            # Wait for the next chunk of results. When verbose=True,
+            # interrupt this wait every few seconds to allow a
+            # progress-report to be written to the user's terminal.
+            if not pending:
+                if verbose:
+                    pending = results.next(timeout=reporter.countdown())
+                else:
+                    pending = results.next()
+
+            k, out = pending.pop()
             if verbose:
-                k, out = results.next(timeout=reporter.countdown())
                 reporter.note_completed_task()
-            else:
-                k, out = results.next()
 
             if isinstance(out, (Image, Spectrum)):
                 # If the function returns images or spectra, make a cube
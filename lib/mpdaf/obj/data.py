@@ -42,7 +42,7 @@ from datetime import datetime
 from numpy import ma
 
 from .coords import WCS, WaveCoord, determine_refframe
-from .objs import UnitMaskedArray, UnitArray, is_int
+from .objs import UnitMaskedArray, is_int
 from ..tools import (MpdafUnitsWarning, fix_unit_read, is_valid_fits_file,
                      copy_header, read_slice_from_fits)
 
@@ -646,6 +646,18 @@ class DataArray:
         """Return a copy of the object."""
         return self.__class__.new_from_obj(self, copy=True)
 
+    def _new_masked(self, data):
+        """Return a copy of the object with a new masked data array.
+
+        The data array is used without copying it, as it is expected to be
+        created by one of the ``numpy.ma.masked_*`` functions, and only the
+        variance array is copied.
+
+        """
+        return self.__class__.new_from_obj(
+            self, data=data,
+            var=False if self._var is None else self._var.copy())
+
     def clone(self, data_init=None, var_init=None):
         """Return a shallow copy with the same header and coordinates.
 
@@ -676,8 +688,15 @@ class DataArray:
         for i in range(1, self.ndim + 1):
             hdr['NAXIS%d' % i] = self.shape[-i]
 
+        # The values given by np.zeros and np.ones are finite, so the mask
+        # doesn't need to be computed from the data
+        if data_init in (np.zeros, np.ones):
+            mask = np.zeros(self.shape, dtype=bool)
+        else:
+            mask = None
+
         return self.__class__(
-            unit=self.unit, dtype=None, copy=False,
+            unit=self.unit, dtype=None, copy=False, mask=mask,
             data=None if data_init is None else data_init(self.shape,
                                                           dtype=self.dtype),
             var=None if var_init is None else var_init(self.shape,
@@ -734,9 +753,7 @@ class DataArray:
         `~mpdaf.obj.DataArray`
 
         """
-        result = self.copy()
-        result.data = np.ma.masked_greater(self.data, item)
-        return result
+        return self._new_masked(np.ma.masked_greater(self.data, item))
 
     def __lt__(self, item):
         """Mask data elements whose values are greater than or equal
@@ -752,9 +769,7 @@ class DataArray:
         `~mpdaf.obj.DataArray`
 
         """
-        result = self.copy()
-        result.data = np.ma.masked_greater_equal(self.data, item)
-        return result
+        return self._new_masked(np.ma.masked_greater_equal(self.data, item))
 
     def __ge__(self, item):
         """Mask data elements whose values are less than a given value (>=).
@@ -769,9 +784,7 @@ class DataArray:
         `~mpdaf.obj.DataArray`
 
         """
-        result = self.copy()
-        result.data = np.ma.masked_less(self.data, item)
-        return result
+        return self._new_masked(np.ma.masked_less(self.data, item))
 
     def __gt__(self, item):
         """Mask data elements whose values are less than or equal to a
@@ -787,9 +800,7 @@ class DataArray:
         `~mpdaf.obj.DataArray`
 
         """
-        result = self.copy()
-        result.data = np.ma.masked_less_equal(self.data, item)
-        return result
+        return self._new_masked(np.ma.masked_less_equal(self.data, item))
 
     def __getitem__(self, item):
         """Return a sliced object.
@@ -980,10 +991,13 @@ class DataArray:
             if var is not None:
                 var = var.reshape(reshape)
 
+        # Keep the dtype of the parent object, so that the new object uses
+        # views of the sliced arrays instead of converted copies.
         return self.__class__(
             data=data, unit=self.unit, var=var, mask=mask, wcs=wcs, wave=wave,
             filename=self.filename, data_header=self.data_header.copy(),
-            primary_header=self.primary_header.copy(), copy=False)
+            primary_header=self.primary_header.copy(), copy=False,
+            dtype=self.dtype, convert_float64=self._convert_float64)
 
     def __setitem__(self, item, other):
         """Set the corresponding part of data."""
@@ -993,16 +1007,17 @@ class DataArray:
         if isinstance(other, DataArray):
             # FIXME: check only step
 
+            # The steps are compared with Python scalars, which is much
+            # cheaper than np.allclose for one or two values.
             if self._has_wave and other._has_wave and \
-                    not np.allclose(self.wave.get_step(),
-                                    other.wave.get_step(unit=self.wave.unit),
-                                    atol=1E-2, rtol=0):
+                    not abs(self.wave.get_step() -
+                            other.wave.get_step(unit=self.wave.unit)) <= 1E-2:
                 raise ValueError('Operation forbidden for cubes with different'
                                  ' world coordinates in spectral direction')
             if self._has_wcs and other._has_wcs and \
-                    not np.allclose(self.wcs.get_step(),
-                                    other.wcs.get_step(unit=self.wcs.unit),
-                                    atol=1E-3, rtol=0):
+                    not all(abs(s1 - s2) <= 1E-3 for s1, s2 in zip(
+                        self.wcs.get_step().tolist(),
+                        other.wcs.get_step(unit=self.wcs.unit).tolist())):
                 raise ValueError('Operation forbidden for cubes with different'
                                  ' world coordinates in spatial directions')
 
@@ -1012,8 +1027,11 @@ class DataArray:
                 other = other.data
             else:
                 if self._var is not None and other._var is not None:
-                    self._var[item] = UnitArray(other._var,
-                                                other.unit**2, self.unit**2)
+                    # Convert the variance in place in the destination,
+                    # rather than in a temporary copy of other._var.
+                    self._var[item] = other._var
+                    self._var[item] *= float(
+                        (other.unit**2).to(self.unit**2))
                 other = UnitMaskedArray(other.data, other.unit, self.unit)
 
         self.data[item] = other
@@ -1047,14 +1065,15 @@ class DataArray:
         `astropy.io.fits.ImageHDU`
 
         """
+        # Work on the raw data array, to avoid copying the mask with the data
         if convert_float32 and self._data.dtype == np.float64:
             # Force data to be stored in float instead of double
-            data = self.data.astype(np.float32)
+            data = self._data.astype(np.float32)
         else:
-            data = self.data
+            data = self._data
 
         # create DATA extension
-        if savemask == 'nan' and ma.count_masked(data) > 0:
+        if savemask == 'nan' and ma.count_masked(self.data) > 0:
             # NaNs can be used only for float arrays, so we raise an exception
             # if there are masked values in a non-float array.
             if not np.issubdtype(data.dtype, np.floating):
@@ -1063,9 +1082,9 @@ class DataArray:
                                  'NaNs. You can either fill the array with '
                                  'another value or use another option for '
                                  'savemask.')
-            data = data.filled(fill_value=np.nan)
-        else:
-            data = data.data
+            if data is self._data:
+                data = data.copy()
+            np.copyto(data, np.nan, where=self._mask)
 
         hdr = copy_header(self.data_header, self.get_wcs_header(),
                           exclude=('CD*', 'PC*', 'CDELT*', 'CRPIX*', 'CRVAL*',
@@ -1121,7 +1140,7 @@ class DataArray:
                 header = header.copy()
                 header.remove('BUNIT', ignore_missing=True)
             return fits.ImageHDU(name=name, header=header,
-                                 data=np.uint8(self.data.mask))
+                                 data=self._mask.view(np.uint8))
 
     def write(self, filename, savemask='dq', checksum=False,
               convert_float32=True):
@@ -1201,7 +1220,10 @@ class DataArray:
             #  vs = (d[sqrt(x)]/dx)**2 * vx
             #     = (0.5 / sqrt(x))**2 * vx
             #     = 0.25 / x * vx.
-            out._var = 0.25 * self._var / self._data
+            # The scaling is done in place to avoid a second temporary.
+            var = np.divide(self._var, self._data)
+            var *= 0.25
+            out._var = var
         return out
 
     def abs(self, out=None):
@@ -1225,7 +1247,10 @@ class DataArray:
     def unmask(self):
         """Unmask the data (just invalid data (nan,inf) are masked)."""
         if self._mask is not ma.nomask:
-            self._mask = ~np.isfinite(self._data)
+            # Invert in place to allocate a single new mask array. The
+            # previous mask is not modified, as it may be shared.
+            mask = np.isfinite(self._data)
+            self._mask = np.logical_not(mask, out=mask)
 
     def mask_variance(self, threshold):
         """Mask pixels with a variance above a threshold value.
@@ -1238,18 +1263,25 @@ class DataArray:
         """
         if self._var is None:
             raise ValueError('Operation forbidden without variance extension.')
-        self.data[self._var > threshold] = ma.masked
+        if self._mask is ma.nomask:
+            self.data[self._var > threshold] = ma.masked
+        else:
+            self._mask |= self._var > threshold
 
     def mask_selection(self, ksel):
         """Mask selected pixels.
 
         Parameters
         ----------
-        ksel : output of np.where
+        ksel : output of np.where, or array of bool
             Elements depending on a condition
 
         """
-        self.data[ksel] = ma.masked
+        if (isinstance(ksel, np.ndarray) and ksel.dtype == bool and
+                ksel.shape == self.shape and self._mask is not ma.nomask):
+            self._mask |= ksel
+        else:
+            self.data[ksel] = ma.masked
 
     def crop(self):
         """Reduce the size of the array to the smallest sub-array that
@@ -1265,26 +1297,35 @@ class DataArray:
             The slices that were used to extract the sub-array.
 
         """
-        nmasked = ma.count_masked(self.data)
-        if nmasked == 0:
+        mask = self._mask
+        if mask is ma.nomask or not mask.any():
             return
-        elif nmasked == np.prod(self.shape):
+        elif mask.all():
             # If all pixels are masked, simply delete data and variance
             self._data = None
             self._var = None
             return
 
+        # Find the pixels that are masked along whole lines or planes of each
+        # axis. The mask is first reduced along the last axis, and the
+        # other axes are then reduced from this smaller array, which needs
+        # only two passes over the full mask.
+        if self.ndim == 1:
+            masked = [mask]
+        else:
+            dimensions = tuple(range(self.ndim - 1))
+            reduced = np.logical_and.reduce(mask, axis=-1)
+            masked = [np.logical_and.reduce(
+                reduced, axis=tuple(d for d in dimensions if d != dim))
+                for dim in dimensions]
+            masked.append(np.logical_and.reduce(mask, axis=dimensions))
+
         # Determine the ranges of indexes along each axis that encompass all of
         # the unmasked pixels, and convert this to slice prescriptions for
         # selecting the corresponding sub-array.
-        dimensions = list(range(self.ndim))
         item = []
-        for dim in dimensions:
-            other_dims = dimensions[:]
-            other_dims.remove(dim)
-            mask = np.apply_over_axes(np.logical_and.reduce, self.data.mask,
-                                      other_dims).ravel()
-            ksel = np.where(~mask)[0]
+        for dim_masked in masked:
+            ksel = np.where(~dim_masked)[0]
             item.append(slice(ksel[0], ksel[-1] + 1, None))
 
         # numpy 1.15: indexing needs a tuple instead of list
@@ -1482,20 +1523,27 @@ class DataArray:
         # of the pixels of each axis that are to be summed on its own axis.
         preshape = np.column_stack((newshape, factor)).ravel()
 
+        # The axes of the reshaped arrays that hold the pixels to be
+        # combined, which are all reduced at once.
+        axes = tuple(range(1, 2 * res.ndim, 2))
+
         # Compute the number of unmasked pixels of the input array
         # that will contribute to each mean pixel in the output array.
-        unmasked = res.data.reshape(preshape).count(1)
-        for k in range(2, res.ndim + 1):
-            unmasked = unmasked.sum(k)
+        data = res.data.reshape(preshape)
+        unmasked = data.count(axis=axes)
+
+        # The sums below are divided by the number of unmasked pixels by
+        # multiplying them with its reciprocal, computed once on the
+        # output grid. Output pixels without any unmasked pixel are masked
+        # at the end, so their count is replaced by 1 to avoid divisions by
+        # zero.
+        scale = 1.0 / np.maximum(unmasked, 1)
 
         # Reduce the size of the data array by taking the mean of
         # successive groups of 'factor[0] x factor[1]' pixels. Note
-        # that the following uses np.ma.mean(), which takes account of
-        # masked pixels.
-        newdata = res.data.reshape(preshape)
-        for k in range(1, res.ndim + 1):
-            newdata = newdata.mean(k)
-        res._data = newdata.data
+        # that the sum of the masked array ignores the masked pixels.
+        newdata = data.sum(axis=axes).data * scale
+        res._data = newdata
 
         # The treatment of the variance array is complicated by the
         # possibility of masked pixels in the data array. A sum of N
@@ -1503,11 +1551,9 @@ class DataArray:
         # sum(v[i] / N^2), where N^2 is the number of unmasked pixels
         # in that particular sum.
         if res._var is not None:
-            newvar = res.var.reshape(preshape)
-            for k in range(1, res.ndim + 1):
-                newvar = newvar.sum(k)
-            newvar /= unmasked**2
-            res._var = newvar.data
+            newvar = (res.var.reshape(preshape).sum(axis=axes).data *
+                      (scale * scale))
+            res._var = newvar
 
         # Any pixels in the output array that come from zero unmasked
         # pixels of the input array should be masked.
@@ -427,8 +427,11 @@ class Image(ArithmeticMixin, DataArray):
         # ellipse and > 1 for pixels outside the ellipse.
         #
         #   k = (xp / rx)**2 + (yp / ry)**2
-        x, y = np.meshgrid((np.arange(sx.start, sx.stop) - center[1]) * step[1],
-                           (np.arange(sy.start, sy.stop) - center[0]) * step[0])
+        #
+        # The X and Y coordinates are a row and a column vector, which are
+        # broadcasted against each other to compute k on the 2D grid.
+        x = (np.arange(sx.start, sx.stop) - center[1])[np.newaxis, :] * step[1]
+        y = (np.arange(sy.start, sy.stop) - center[0])[:, np.newaxis] * step[0]
         ksel = (((x * cospa + y * sinpa) / radii[0]) ** 2 +
                 ((y * cospa - x * sinpa) / radii[1]) ** 2)
 
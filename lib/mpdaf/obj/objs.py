@@ -221,20 +221,18 @@ def bounding_box(form, center, radii, shape, posangle=0.0, step=None):
     # Compute the ideal slices that would select the bounding box.
     ideal_slices = [slice(first[0], last[0] + 1), slice(first[1], last[1] + 1)]
 
-    # Are the selected pixels of the axes outside the bounds of the array?
-    max_indexes = np.asarray(shape) - 1
-    outside = np.logical_or(last < 0, first > max_indexes)
-
-    # Clip the first and last pixels to ensure that they lie within
-    # the bounds of the image.
-    imin, jmin = np.clip(first, (0, 0), max_indexes)
-    imax, jmax = np.clip(last, (0, 0), max_indexes)
-
-    # Compute the corresponding slices, replacing the clipped
-    # values by a zero-pixel range where the pre-clipped indexes
-    # were entirely outside the array.
-    clipped_slices = [slice(imin, (imax + 1) if not outside[0] else imax),
-                      slice(jmin, (jmax + 1) if not outside[1] else jmax)]
+    # Clip the first and last pixels of each axis to ensure that they lie
+    # within the bounds of the image, replacing the clipped values by a
+    # zero-pixel range where the pre-clipped indexes were entirely outside
+    # the array. With only two axes, this is done with Python scalars,
+    # which is faster than numpy operations on tiny arrays.
+    clipped_slices = []
+    for lo, hi, n in zip(first.tolist(), last.tolist(), shape):
+        max_index = int(n) - 1
+        outside = hi < 0 or lo > max_index
+        lo = min(max(lo, 0), max_index)
+        hi = min(max(hi, 0), max_index)
+        clipped_slices.append(slice(lo, hi if outside else hi + 1))
 
     # Return the ranges as slice objects, along with the effective
     # center of the region.
@@ -121,6 +121,28 @@ def test_arithmetic_variance(cube):
     cube2 = image1 * cube
     assert_almost_equal(cube2.var, image1.var * cube.data * cube.data)
 
+    # The variance of the result must be writable and not shared with the
+    # variance of the operands
+    cube2 = cube + image1
+    cube2.var *= 2
+    assert_almost_equal(cube2.var,
+                        2 * np.tile(image1.var, (cube2.shape[0], 1, 1)))
+
+    cube.var = cube.data.data ** 2
+    cube2 = cube + generate_image(wcs=cube.wcs, var=None)
+    cube2.var *= 2
+    assert_almost_equal(cube.var, cube.data ** 2)
+
+
+def test_arithmetic_nomask():
+    """Cube class: tests arithmetic functions without masks"""
+    cube1 = generate_cube(mask=ma.nomask)
+    cube2 = generate_cube(data=3.0, mask=ma.nomask)
+    for op in (add, sub, mul):
+        cube3 = op(cube1, cube2)
+        assert cube3.mask is ma.nomask
+        assert_almost_equal(cube3.data, op(cube1._data, cube2._data))
+
 
 def test_get_cube(cube):
     """Cube class: tests getters"""
@@ -158,6 +180,22 @@ def test_crop(cube):
     cube.crop()
     assert cube.shape[0] == 9
 
+    # Mask margins along the three axes, and a pixel inside the cube
+    cube.mask[-2:, :, :] = True
+    cube.mask[:, :2, :] = True
+    cube.mask[:, :, -1] = True
+    cube.mask[3, 3, 2] = True
+    item = cube.crop()
+    assert item == (slice(0, 7), slice(2, 6), slice(0, 4))
+    assert cube.shape == (7, 4, 4)
+    assert cube.wcs.naxis1 == 4 and cube.wcs.naxis2 == 4
+    assert cube.wave.shape == 7
+    assert cube.mask[3, 1, 2]
+
+    cube.mask[:] = True
+    cube.crop()
+    assert cube._data is None
+
 
 # A function for testing the multiprocessing function, which takes an
 # Image or a Spectrum object as its argument and returns 10 times the
@@ -326,6 +364,46 @@ def test_mask(cube):
     assert_array_equal(cube.data.mask, mask)
 
 
+def test_mask_region_out_of_range(cube):
+    """Cube class: testing mask_region with a wavelength range that starts
+    before the first plane of the cube"""
+    # The same 2x2 region as in test_mask
+    expected_mask = np.zeros(cube.shape[1:], dtype=bool)
+    expected_mask[2:4, 1:3] = True
+
+    cube.mask_region((2.1, 1.8), (1, 1), lmin=-5, lmax=5, inside=True,
+                     unit_center=None, unit_radius=None, unit_wave=None)
+    assert_array_equal(np.all(cube._mask[:5, :, :], axis=0), expected_mask)
+    assert_array_equal(np.any(cube._mask[:5, :, :], axis=0), expected_mask)
+    assert not np.any(cube._mask[5:, :, :])
+    cube.unmask()
+
+    cube.mask_region((2.1, 1.8), (1, 1), lmin=-5, lmax=5, inside=False,
+                     unit_center=None, unit_radius=None, unit_wave=None)
+    assert_array_equal(np.all(cube._mask[:5, :, :], axis=0), ~expected_mask)
+    assert_array_equal(np.any(cube._mask[:5, :, :], axis=0), ~expected_mask)
+    assert np.all(cube._mask[5:, :, :])
+
+
+def test_mask_ellipse_out_of_range(cube):
+    """Cube class: testing mask_ellipse with a wavelength range that starts
+    before the first plane of the cube"""
+    cube.mask_ellipse([2.5, 2], 1.6, 0.0, lmin=-5, lmax=5, inside=True,
+                      unit_center=None, unit_radius=None, unit_wave=None)
+    expected_mask = cube._mask[0].copy()
+    assert np.any(expected_mask) and not np.all(expected_mask)
+    assert_array_equal(cube._mask[:5, :, :],
+                       np.broadcast_to(expected_mask, (5,) + cube.shape[1:]))
+    assert not np.any(cube._mask[5:, :, :])
+    cube.unmask()
+
+    cube.mask_ellipse([2.5, 2], 1.6, 0.0, lmin=-5, lmax=5, inside=False,
+                      unit_center=None, unit_radius=None, unit_wave=None)
+    assert_array_equal(cube._mask[:5, :, :],
+                       np.broadcast_to(~expected_mask, (5,) + cube.shape[1:]))
+    assert np.all(cube._mask[5:, :, :])
+
+
 def test_truncate():
     """Cube class: testing truncation"""
     cube1 = generate_cube(data=2, wave=WaveCoord(crval=1))
@@ -283,6 +283,12 @@ def test_clone_with_data():
     assert np.shares_memory(cube2.data.mask, cube2.mask)
     assert np.shares_memory(cube2.var.mask, cube2.mask)
 
+    # With np.zeros, the mask is created without looking at the data
+    cube2 = cube1.clone(data_init=np.zeros, var_init=np.zeros)
+    assert_array_equal(cube2.mask, np.zeros(shape, dtype=bool))
+    assert_array_equal(cube2.data, np.zeros(shape))
+    assert_array_equal(cube2.var, np.zeros(shape))
+
 
 def test_pickle(cube, minicube):
     cube3 = Cube(get_data_file('obj', 'CUBE.fits'))
@@ -427,6 +433,10 @@ def test_comparisons():
     assert np.shares_memory(s.data.mask, s.mask)
     assert np.shares_memory(s.var.mask, s.mask)
 
+    # Check that the arrays of the result are not shared with the input
+    for attr in ('_data', '_var', '_mask'):
+        assert not np.shares_memory(getattr(s, attr), getattr(spec, attr))
+
 
 def test_getitem():
     """DataArray class: Testing the __getitem__ method"""
@@ -1552,6 +1562,25 @@ def test_float32_ndarray():
     assert np.shares_memory(d.var.mask, d.mask)
 
 
+def test_getitem_float32():
+    """DataArray class: testing that slices keep the float32 dtype"""
+    data = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+    var = np.ones(data.shape, dtype=np.float32)
+    d = DataArray(data=data, var=var, convert_float64=False)
+    assert d.dtype == np.float32
+    assert d.var.dtype == np.float32
+
+    # The slice keeps the dtype of its parent, and its arrays are views of
+    # the arrays of the parent.
+    d2 = d[:, 1:, :2]
+    assert d2.dtype == np.float32
+    assert d2.var.dtype == np.float32
+    assert_array_equal(d2.data, data[:, 1:, :2])
+    assert np.shares_memory(d2._data, d._data)
+    assert np.shares_memory(d2._var, d._var)
+    assert np.shares_memory(d2._mask, d._mask)
+
+
 def test_replace_data():
     """Test replacement of the data array"""
     testimg = get_data_file('obj', 'a370II.fits')
@@ -37,14 +37,15 @@ import numpy as np
 import pytest
 import scipy.ndimage as ndi
 
-from mpdaf.obj import Image, WCS, gauss_image, moffat_image
+from mpdaf.obj import Image, WCS, gauss_image, moffat_image, arithmetic
 from numpy.testing import (assert_array_equal, assert_allclose,
                            assert_almost_equal, assert_equal,
                            assert_array_almost_equal)
 from operator import add, sub, mul, truediv as div
 
 from mpdaf.tests.utils import (assert_image_equal, generate_image,
-                               generate_cube, assert_masked_allclose)
+                               generate_cube, generate_spectrum,
+                               assert_masked_allclose)
 
 
 def test_copy(image):
@@ -82,6 +83,12 @@ def test_arithmetic_scalar(image):
     for op in (add, sub, mul, div):
         assert_allclose(op(4.2, image).data, op(4.2, 2))
 
+    # The masked pixels are kept in the result
+    image.mask[1, 2] = True
+    for op in (add, sub, mul, div):
+        assert_array_equal(op(image, 4.2).mask, image.mask)
+        assert_array_equal(op(4.2, image).mask, image.mask)
+
 
 def test_arithmetic_cubes():
     image2 = generate_image(data=1, unit='2 ct')
@@ -102,6 +109,65 @@ def test_arithmetic_spectra(image, spectrum):
                     np.sqrt(image.data + 4) - 2)
 
 
+@pytest.mark.parametrize('op', (add, sub, mul, div))
+def test_arithmetic_spectra_nomask(op):
+    # Only one of the operands has a mask, which must be broadcasted to the
+    # shape of the resulting cube.
+    for masked in ('image', 'spectrum'):
+        image = generate_image(data=np.arange(1, 31.).reshape(6, 5))
+        spectrum = generate_spectrum()
+        if masked == 'image':
+            image.mask[1, 2] = True
+            spectrum.mask = np.ma.nomask
+        else:
+            spectrum.mask[2] = True
+            image.mask = np.ma.nomask
+
+        ima = image.data[np.newaxis]
+        sp = spectrum.data[:, np.newaxis, np.newaxis]
+        for res, ref in ((op(image, spectrum), op(ima, sp)),
+                         (op(spectrum, image), op(sp, ima))):
+            assert res.shape == (spectrum.shape[0],) + image.shape
+            assert_masked_allclose(res.data, ref)
+
+
+def test_arithmetic_spectra_single_variance():
+    # Only one of the operands has a variance, which must be broadcasted to
+    # the shape of the resulting cube, after the conversion to the unit of
+    # the image for the spectrum: a variance of 0.5 (2 ct)**2 is 2 ct**2.
+    unit = u.Unit('2 ct')
+    for image, spectrum in (
+            (generate_image(var=2.0), generate_spectrum(var=None, unit=unit)),
+            (generate_image(var=None), generate_spectrum(var=0.5, unit=unit))):
+        assert spectrum.unit == unit
+        for res in (image + spectrum, image - spectrum, spectrum + image):
+            assert res.unit == u.ct
+            assert res.shape == (spectrum.shape[0],) + image.shape
+            assert_allclose(res.var, 2.0)
+
+
+@pytest.mark.parametrize('numexpr', (True, False))
+def test_arithmetic_spectra_variance(numexpr, monkeypatch):
+    if not numexpr:
+        monkeypatch.setattr(arithmetic, 'numexpr', False)
+
+    image = generate_image(data=np.arange(1, 31.).reshape(6, 5), var=2.0)
+    spectrum = generate_spectrum(var=0.5)
+    ima = image.data.data[np.newaxis]
+    sp = spectrum.data.data[:, np.newaxis, np.newaxis]
+    refvar = 2.0 * sp**2 + 0.5 * ima**2
+
+    cube = image * spectrum
+    assert cube.shape == (spectrum.shape[0],) + image.shape
+    assert_allclose(cube.data, ima * sp)
+    assert_allclose(cube.var, refvar)
+
+    cube = image / spectrum
+    assert cube.shape == (spectrum.shape[0],) + image.shape
+    assert_allclose(cube.data, ima / sp)
+    assert_allclose(cube.var, refvar / sp**4)
+
+
 def test_get(image):
     """Image class: testing getters"""
     ima = image[0:2, 1:4]
@@ -620,6 +686,38 @@ def test_rebin():
     assert start[1] == 0.5
 
 
+def test_rebin_masked_mean():
+    """Image class: testing that rebin gives the mean of the unmasked
+    pixels of each block."""
+    data = np.arange(16.0).reshape(4, 4)
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[0, 1] = True
+    image1 = Image(data=data, mask=mask, var=np.ones(data.shape) * 0.5,
+                   wcs=WCS(crval=(0, 0)))
+
+    # The first block has 3 unmasked pixels, 0, 4 and 5, whose mean is 3,
+    # and not 3.5, the mean of the means (0+4)/2 and 5 of its columns.
+    # The variance of a mean of N pixels of variance 0.5 is 0.5/N.
+    image2 = image1.rebin(2)
+    expected = np.ma.array([[3.0, 4.5], [10.5, 12.5]], mask=False)
+    assert_masked_allclose(image2.data, expected)
+    expected = np.ma.array([[0.5 / 3, 0.125], [0.125, 0.125]], mask=False)
+    assert_masked_allclose(image2.var, expected)
+
+
+def test_rebin_int():
+    """Image class: testing rebin with an integer data array."""
+    data = np.arange(24).reshape(4, 6)
+    image1 = Image(data=data, var=np.ones(data.shape), wcs=WCS(crval=(0, 0)))
+    assert image1.dtype.kind == 'i'
+
+    # The means of integer pixels are not integers.
+    image2 = image1.rebin(2)
+    assert image2.dtype.kind == 'f'
+    assert_allclose(image2.data, [[3.5, 5.5, 7.5], [15.5, 17.5, 19.5]])
+    assert_allclose(image2.var, 0.25)
+
+
 def test_fftconvolve():
     """Image class: testing FFT convolution method."""
     wcs = WCS(cdelt=(0.2, 0.3), crval=(8.5, 12), shape=(40, 30), deg=True)
@@ -260,8 +260,8 @@ def generate_spectrum(data=None, var=1.0, mask=None, shape=None,
 
     """
     return _generate_test_data(data=data, var=var, mask=mask, shape=shape,
-                               uwave=uwave, wave=wave, copy=copy, ndim=1,
-                               crpix=crpix, cdelt=cdelt, crval=crval)
+                               unit=unit, uwave=uwave, wave=wave, copy=copy,
+                               ndim=1, crpix=crpix, cdelt=cdelt, crval=crval)
 
 
 def generate_cube(data=2.3, var=1.0, **kwargs):